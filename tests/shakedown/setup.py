@@ -47,7 +47,6 @@ setup(name='dcos-shakedown',
           'retrying',
           'six>=1.9, <2.0',
           'scp',
-          'sseclient==0.0.14',
           'retrying==1.3.3',
           'toml>=0.9, <1.0',
       ],
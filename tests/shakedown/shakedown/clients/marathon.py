@@ -1,5 +1,6 @@
 import json
 import logging
+import requests
 
 from six.moves import urllib
 
@@ -84,6 +85,33 @@ class Client(object):
         else:
             return response.json()
 
+    def app_exists(self, app_id):
+        """Checks whether the requested application exists. Only a HEAD
+        request is sent, so no application representation is transferred
+        or parsed.
+
+        :param app_id: the ID of the application
+        :type app_id: str
+        :returns: True if the application exists, False if Marathon does
+                  not know it
+        :rtype: bool
+        :raises requests.HTTPError: for any other response
+        """
+
+        app_id = util.normalize_marathon_id_path(app_id)
+        path = 'v2/apps{}'.format(app_id)
+
+        response = self._rpc.session.head(path, allow_redirects=False)
+        if response.status_code == 200:
+            return True
+        elif response.status_code == 404:
+            return False
+
+        response.raise_for_status()
+        # Redirects and other non-error responses do not tell whether the application exists either
+        raise requests.HTTPError(
+            'Unexpected status code {} for {}'.format(response.status_code, response.url), response=response)
+
     def get_groups(self):
         """Get a list of known groups.
 
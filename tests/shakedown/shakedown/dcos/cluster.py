@@ -119,15 +119,21 @@ def _metadata_helper(json_path):
     return None
 
 
+_security_mode = None
+
+
 def ee_version():
     """ Provides the type or version of EE if it is Enterprise.
         Useful for @pytest.mark.skipif("ee_version() in {'strict', 'disabled'}")
+        The security mode cannot change while a cluster is running, hence a successful lookup is cached.
+        A failed metadata request is not, so that it is retried on the next call.
     """
-    metadata = bootstrap_metadata()
-    if metadata:
-        return metadata['security']
-    else:
-        return None
+    global _security_mode
+    if _security_mode is None:
+        metadata = bootstrap_metadata()
+        if metadata:
+            _security_mode = metadata['security']
+    return _security_mode
 
 
 def is_strict():
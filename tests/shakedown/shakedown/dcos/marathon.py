@@ -3,6 +3,7 @@ import pytest
 import logging
 
 from distutils.version import LooseVersion
+from functools import lru_cache
 
 from .service import service_available_predicate
 from ..clients import marathon
@@ -23,7 +24,11 @@ def marathon_version(client=None):
     return LooseVersion(about.get("version"))
 
 
+@lru_cache()
 def marathon_version_less_than(version):
+    """ Returns True if the root Marathon is older than {version}. The result is cached since this is evaluated
+        by `pytest.mark.skipif` for every test and the root Marathon is not upgraded during a test run.
+    """
     return marathon_version() < LooseVersion(version)
 
 
@@ -1,6 +1,8 @@
+import copy
 import os.path
 import logging
 
+from functools import lru_cache
 from utils import make_id, get_resource
 from os.path import join
 
@@ -11,10 +13,18 @@ def apps_dir():
     return os.path.dirname(os.path.abspath(__file__))
 
 
-def load_app(app_def_file, app_id=None, parent_group="/"):
-    """Loads an app definition from a json file and sets the app id."""
+@lru_cache()
+def _app_template(app_def_file):
+    """Reads and parses an app definition json file only once per test run."""
     app_path = os.path.join(apps_dir(), "{}.json".format(app_def_file))
-    app = get_resource(app_path)
+    return get_resource(app_path)
+
+
+def load_app(app_def_file, app_id=None, parent_group="/"):
+    """Loads an app definition from a json file and sets the app id.
+       Every call returns a fresh copy, so callers are free to modify it.
+    """
+    app = copy.deepcopy(_app_template(app_def_file))
 
     if app_id is None:
         app['id'] = make_id(app_def_file, parent_group)
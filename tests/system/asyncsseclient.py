@@ -32,15 +32,24 @@ class SSEClient(object):
         Unfortunately it is possible for some servers to decide to break an
         event into multiple HTTP chunks in the response. It is thus necessary
         to correctly stitch together consecutive response chunks and find the
-        SSE delimiter (empty new line) to yield full, correct event chunks."""
-        data = b''
+        SSE delimiter (empty new line) to yield full, correct event chunks.
+
+        Only the incoming line is inspected for the delimiter and lines are
+        appended to a mutable buffer, so reading stays linear in the length
+        of the stream."""
+        data = bytearray()
         async for line in self._event_stream:
+            if not line.rstrip(b'\r\n'):
+                if data:
+                    yield bytes(data)
+                    data = bytearray()
+                continue
             data += line
-            if data.endswith((b'\r\r', b'\n\n', b'\r\n\r\n')):
-                yield data
-                data = b''
+            if line.endswith(b'\r\r'):
+                yield bytes(data)
+                data = bytearray()
         if data:
-            yield data
+            yield bytes(data)
 
     async def events(self):
         async for chunk in self._read():
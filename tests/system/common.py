@@ -1,3 +1,4 @@
+import aiohttp
 import asyncio
 import json
 import os
@@ -10,10 +11,11 @@ import requests
 import logging
 
 from datetime import timedelta
+from asyncsseclient import SSEClient
 from json.decoder import JSONDecodeError
 from shakedown.clients import mesos, marathon, dcos_url_path
 from shakedown.clients.authentication import dcos_acs_token, DCOSAcsAuth
-from shakedown.clients.rpcclient import verify_ssl
+from shakedown.clients.rpcclient import get_ssl_context, verify_ssl
 from shakedown.dcos import dcos_version, marathon_leader_ip, master_leader_ip
 from shakedown.dcos.agent import get_private_agents
 from shakedown.dcos.cluster import ee_version
@@ -51,6 +53,13 @@ def ignore_provided_exception(toTest):
     return lambda exc: isinstance(exc, toTest)
 
 
+def ignore_server_error(exc):
+    """Used with @retrying.retry to retry on HTTP 5xx responses only, e.g. while the admin router does not know
+       the new Marathon leader yet. Any other exception, including assertion errors, is not retried.
+    """
+    return isinstance(exc, requests.HTTPError) and exc.response is not None and exc.response.status_code >= 500
+
+
 def constraints(name, operator, value=None):
     constraints = [name, operator]
     if value is not None:
@@ -226,6 +235,38 @@ def block_iptable_rules_for_seconds(host, port_number, sleep_seconds, block_inpu
     run_command_on_agent(host, cmd)
 
 
+def block_iptable_rules_until(host, port_number, predicate, max_seconds=120, block_input=True, block_output=True):
+    """ Blocks a port like `block_iptable_rules_for_seconds` but restores the iptables rules as soon as
+        `predicate()` holds. The predicate is checked every 2 seconds. A background job on the host restores the
+        rules after `max_seconds` in any case, so they are not left behind if the test process dies.
+
+        :return: True if the predicate held before `max_seconds` passed, False otherwise
+    """
+    filename = 'iptables-{}.rules'.format(uuid.uuid4().hex)
+    restore = 'if [ -e {backup} ]; then sudo iptables-restore < {backup} && sudo rm {backup} ; fi'.format(
+        backup=filename)
+    cmd = """
+          if [ ! -e {backup} ] ; then sudo iptables-save > {backup} ; fi;
+          {block}
+          nohup sh -c 'sleep {seconds}; {restore}' > /dev/null 2>&1 &
+        """.format(backup=filename, seconds=max_seconds, restore=restore,
+                   block=iptables_block_string(block_input, block_output, port_number))
+
+    run_command_on_agent(host, cmd)
+    try:
+        deadline = time.time() + max_seconds
+        while time.time() < deadline:
+            try:
+                if predicate():
+                    return True
+            except Exception as e:
+                logger.debug('Failed to evaluate the predicate while port {} is blocked: {}'.format(port_number, e))
+            time.sleep(2)
+        return False
+    finally:
+        run_command_on_agent(host, restore)
+
+
 def iptables_block_string(block_input, block_output, port):
     """ Produces a string of iptables blocking command that can be executed on an agent. """
     block_input_str = "sudo iptables -I INPUT -p tcp --dport {} -j DROP;".format(port) if block_input else ""
@@ -720,6 +761,71 @@ def assert_marathon_leadership_changed(original_leader):
     return new_leader_dns
 
 
+class MarathonEventStream(object):
+    """ Async context manager which connects to the root Marathon event stream through the admin router of the
+        configured DCOS_URL. Iterate over `events()` to receive the parsed events.
+    """
+
+    async def __aenter__(self):
+        url = dcos_url_path('service/marathon/v2/events')
+        headers = {'Authorization': 'token={}'.format(dcos_acs_token()),
+                   'Accept': 'text/event-stream'}
+
+        ssl_context = get_ssl_context()
+        self._session = aiohttp.ClientSession(headers=headers)
+        await self._session.__aenter__()
+        try:
+            self._request = self._session.get(url, verify_ssl=ssl_context is not None, ssl_context=ssl_context)
+            self.response = await self._request.__aenter__()
+        except BaseException:
+            await self._session.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self._request.__aexit__(exc_type, exc, tb)
+        finally:
+            await self._session.__aexit__(exc_type, exc, tb)
+
+    async def events(self):
+        async for event in SSEClient(self.response.content).events():
+            yield json.loads(event.data)
+
+
+async def __event_stream_attached():
+    """ Connects to the Marathon event stream until the `event_stream_attached` event is received.
+        Standby instances reject event stream connections, so the event is only sent once a leader is elected
+        and ready. Failed connections are retried right away instead of polling the ping endpoint.
+
+        Note that only the admin router of DCOS_URL is checked. The admin routers of other masters might still
+        proxy to the old leader for up to 30 seconds, so follow-up requests should retry on 5xx responses.
+    """
+    while True:
+        try:
+            async with MarathonEventStream() as stream:
+                if stream.response.status == 200:
+                    async for event in stream.events():
+                        if event['eventType'] == 'event_stream_attached':
+                            return
+        except aiohttp.ClientError as e:
+            logger.info('Marathon event stream is not available yet: {}'.format(e))
+        await asyncio.sleep(0.5)
+
+
+async def await_marathon_leader_ready(within=timedelta(minutes=5).total_seconds()):
+    """ Waits until a Marathon leader accepts event stream connections.
+    """
+    await asyncio.wait_for(__event_stream_attached(), within)
+
+
+async def await_marathon_leadership_changed(original_leader, within=timedelta(minutes=5).total_seconds()):
+    """ Waits for a new Marathon leader to be ready and verifies that it is not the original one.
+    """
+    await await_marathon_leader_ready(within)
+    return assert_marathon_leadership_changed(original_leader)
+
+
 def running_status_network_info(task_statuses):
     """ From a given list of statuses retrieved from mesos API it returns network info of running task.
     """
@@ -1,6 +1,13 @@
 import logging
 import logging.config
+import os
+import pytest
 
 
 def pytest_configure(config):
+    # The system tests wipe the root group with `common.clean_up_marathon()` and abdicate or partition the Marathon
+    # leader. Both break every test running at the same time, so the tests must not be spread over xdist workers.
+    if config.getoption('numprocesses', default=None) or 'PYTEST_XDIST_WORKER' in os.environ:
+        raise pytest.UsageError('The system integration tests have to run serially. Do not use pytest-xdist (-n).')
+
     logging.config.fileConfig('logging.conf')
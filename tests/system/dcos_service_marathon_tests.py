@@ -105,3 +105,7 @@ def test_framework_never_deploys_due_to_bad_readiness_check():
     assert deployment is not None, "The deployment finished, but it should not"
     assert deployment['currentActions'][0]['readinessCheckResults'][0]['ready'] is False, \
         "The application is ready, but it is expected not to be"
+
+
+# Only test functions are picked up by `from dcos_service_marathon_tests import *`.
+__all__ = [name for name in dir() if name.startswith('test_')]
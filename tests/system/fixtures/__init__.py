@@ -1,23 +1,19 @@
-import aiohttp
 import common
-import json
 import os.path
 import pytest
+import requests
 import logging
 
 from datetime import timedelta
 
-from shakedown.clients import dcos_url_path
-from shakedown.clients.authentication import dcos_acs_token
-from shakedown.clients.rpcclient import get_ssl_context
+from shakedown.clients import marathon
 from shakedown.dcos.agent import get_agents, get_private_agents
 from shakedown.dcos.command import run_command_on_agent
 from shakedown.dcos.cluster import ee_version
 from shakedown.dcos.file import copy_file_from_agent
-from shakedown.dcos.marathon import marathon_on_marathon
+from shakedown.dcos.marathon import deployment_wait, marathon_on_marathon
 from shakedown.dcos.security import add_user, set_user_permission, remove_user, remove_user_permission
 from shakedown.dcos.service import wait_for_service_endpoint
-from asyncsseclient import SSEClient
 
 logger = logging.getLogger(__name__)
 
@@ -26,14 +22,66 @@ def fixtures_dir():
     return os.path.dirname(os.path.abspath(__file__))
 
 
-@pytest.fixture(scope="function")
-def wait_for_marathon_and_cleanup():
+@pytest.fixture(scope="session")
+def marathon_client():
+    """ Fixture which yields a root Marathon client that is shared by all tests of a session. It keeps its HTTP
+    session and thus the connections to Marathon alive between tests.
+    """
+    return marathon.create_client()
+
+
+@pytest.fixture(scope="session")
+def wait_for_marathon():
     wait_for_service_endpoint('marathon', timedelta(minutes=5).total_seconds(), path="ping")
+
+
+@pytest.fixture(scope="function")
+def wait_for_marathon_and_cleanup(wait_for_marathon):
     yield
     wait_for_service_endpoint('marathon', timedelta(minutes=5).total_seconds(), path="ping")
     common.clean_up_marathon()
 
 
+class MarathonCleanup(object):
+    """Collects the apps and pods a test deployed so that only these are removed after the test."""
+
+    def __init__(self):
+        self.app_ids = []
+        self.pod_ids = []
+
+    def register(self, app_id):
+        self.app_ids.append(app_id)
+
+    def register_pod(self, pod_id):
+        self.pod_ids.append(pod_id)
+
+    def remove_registered(self, client):
+        # Always wait, since the test might have abdicated or partitioned the leader without deploying anything.
+        wait_for_service_endpoint('marathon', timedelta(minutes=5).total_seconds(), path="ping")
+        # Apps and pods the test already removed itself are answered with a 404.
+        for app_id in self.app_ids:
+            client.remove_app(app_id, True)
+        for pod_id in self.pod_ids:
+            try:
+                client.remove_pod(pod_id, True)
+            except requests.HTTPError as e:
+                if e.response.status_code != 404:
+                    raise
+        for service_id in self.app_ids + self.pod_ids:
+            deployment_wait(service_id=service_id)
+
+
+@pytest.fixture(scope="function")
+def cleanup_marathon(wait_for_marathon, marathon_client):
+    """ Fixture which yields a `MarathonCleanup` the test registers the ids of its deployed apps and pods with.
+    Only these are removed after the test instead of wiping the whole root group. Marathon is waited for after
+    every test, whether anything was registered or not.
+    """
+    registry = MarathonCleanup()
+    yield registry
+    registry.remove_registered(marathon_client)
+
+
 @pytest.fixture(scope="function")
 def wait_for_marathon_user_and_cleanup():
     wait_for_service_endpoint('marathon-user', timedelta(minutes=5).total_seconds(), path="ping")
@@ -56,20 +104,8 @@ def parent_group(request):
 
 @pytest.fixture
 async def sse_events():
-    url = dcos_url_path('service/marathon/v2/events')
-    headers = {'Authorization': 'token={}'.format(dcos_acs_token()),
-               'Accept': 'text/event-stream'}
-
-    ssl_context = get_ssl_context()
-    verify_ssl = ssl_context is not None
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(url, verify_ssl=verify_ssl, ssl_context=ssl_context) as response:
-            async def internal_generator():
-                client = SSEClient(response.content)
-                async for event in client.events():
-                    yield json.loads(event.data)
-
-            yield internal_generator()
+    async with common.MarathonEventStream() as stream:
+        yield stream.events()
 
 
 @pytest.fixture(scope="function")
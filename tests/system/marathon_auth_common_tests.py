@@ -31,3 +31,7 @@ def test_authorized_non_super_user(user_billy):
     with dcos_user('billy', 'billy') as auth_token:
         client = marathon.create_client(auth_token=auth_token)
         assert len(client.get_apps()) == 0
+
+
+# Only test functions are picked up by `from marathon_auth_common_tests import *`.
+__all__ = [name for name in dir() if name.startswith('test_')]
@@ -1265,3 +1265,7 @@ def test_ipv6_healthcheck(docker_ipv6_network_fixture):
         "The number of healthy tasks is {}, but {} was expected".format(app['tasksHealthy'], target_instances_count)
 
     client.remove_app(app['id'], True)
+
+
+# Only test functions are picked up by `from marathon_common_tests import *`.
+__all__ = [name for name in dir() if name.startswith('test_')]
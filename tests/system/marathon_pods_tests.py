@@ -21,7 +21,7 @@ from shakedown.dcos.command import run_command_on_master
 from shakedown.dcos.marathon import deployment_wait, marathon_version_less_than # NOQA F401
 from urllib.parse import urljoin
 
-from fixtures import sse_events, wait_for_marathon_and_cleanup # NOQA
+from fixtures import sse_events, wait_for_marathon, wait_for_marathon_and_cleanup # NOQA
 
 logger = logging.getLogger(__name__)
 
@@ -624,3 +624,7 @@ def test_pod_with_persistent_volume_recovers():
 
     check_data(port1, path1, f"{expected_data1}\n{expected_data2}\n")
     check_data(port2, path2, f"{expected_data1}\n{expected_data2}\n")
+
+
+# Only test functions are picked up by `from marathon_pods_tests import *`.
+__all__ = [name for name in dir() if name.startswith('test_')]
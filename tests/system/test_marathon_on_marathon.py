@@ -25,12 +25,8 @@ from shakedown.dcos.service import wait_for_service_endpoint
 from shakedown.dcos.task import wait_for_task
 from shakedown.dcos.zookeeper import delete_zk_node
 
-# the following lines essentially do:
-#     from marathon_common_tests import test_*
-import marathon_common_tests
-for attribute in dir(marathon_common_tests):
-    if attribute.startswith('test_'):
-        exec("from marathon_common_tests import {}".format(attribute))
+# The module exposes only its `test_*` functions through `__all__`.
+from marathon_common_tests import *  # NOQA F401,F403
 
 from shakedown.dcos.agent import required_private_agents # NOQA
 from fixtures import wait_for_marathon_user_and_cleanup # NOQA
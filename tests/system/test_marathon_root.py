@@ -6,7 +6,9 @@
 """
 
 import apps
+import asyncio
 import common
+import concurrent.futures
 import json
 import os
 import pytest
@@ -16,48 +18,27 @@ import uuid
 
 from datetime import timedelta
 
-import dcos_service_marathon_tests
-import marathon_auth_common_tests
-import marathon_common_tests
-import marathon_pods_tests
-
-from shakedown.clients import marathon
-from shakedown.dcos import marathon_leader_ip
+from shakedown.dcos import dcos_dns_lookup, marathon_leader_ip
 from shakedown.dcos.agent import get_private_agents, get_public_agents, public_agents, required_public_agents # NOQA F401
 from shakedown.dcos.cluster import dcos_1_9, dcos_version_less_than, ee_version, is_strict # NOQA F401
 from shakedown.dcos.command import run_command, run_command_on_agent, run_command_on_master
 from shakedown.dcos.marathon import deployment_wait, marathon_version_less_than # NOQA F401
 from shakedown.dcos.master import get_all_master_ips, masters, is_multi_master, required_masters # NOQA F401
 from shakedown.dcos.service import wait_for_service_endpoint
-from fixtures import sse_events, wait_for_marathon_and_cleanup, user_billy, docker_ipv6_network_fixture, archive_sandboxes, install_enterprise_cli # NOQA F401
-
-
-# the following lines essentially do:
-#     from dcos_service_marathon_tests import test_*
-for attribute in dir(dcos_service_marathon_tests):
-    if attribute.startswith('test_'):
-        exec("from dcos_service_marathon_tests import {}".format(attribute))
+from fixtures import sse_events, marathon_client, wait_for_marathon, wait_for_marathon_and_cleanup, cleanup_marathon, user_billy, docker_ipv6_network_fixture, archive_sandboxes, install_enterprise_cli # NOQA F401
 
-# the following lines essentially do:
-#     from marathon_auth_common_tests import test_*
-for attribute in dir(marathon_auth_common_tests):
-    if attribute.startswith('test_'):
-        exec("from marathon_auth_common_tests import {}".format(attribute))
 
-# the following lines essentially do:
-#     from marathon_common_tests import test_*
-for attribute in dir(marathon_common_tests):
-    if attribute.startswith('test_'):
-        exec("from marathon_common_tests import {}".format(attribute))
+# Each module exposes only its `test_*` functions through `__all__`.
+from dcos_service_marathon_tests import *  # NOQA F401,F403
+from marathon_auth_common_tests import *  # NOQA F401,F403
+from marathon_common_tests import *  # NOQA F401,F403
+from marathon_pods_tests import *  # NOQA F401,F403
 
-# the following lines essentially do:
-#     from marathon_pods_tests import test_*
-for attribute in dir(marathon_pods_tests):
-    if attribute.startswith('test_'):
-        exec("from marathon_pods_tests import {}".format(attribute))
 
+pytestmark = [pytest.mark.usefixtures('cleanup_shared_tests')]
 
-pytestmark = [pytest.mark.usefixtures('wait_for_marathon_and_cleanup')]
+# Maximum number of hosts a command is run on at the same time over SSH
+SSH_CONCURRENCY = 8
 
 
 @pytest.fixture(scope="function")
@@ -65,6 +46,15 @@ def marathon_service_name():
     return "marathon"
 
 
+@pytest.fixture(scope="function")
+def cleanup_shared_tests(request):
+    """ The tests re-exported from the shared modules do not register what they deploy, so Marathon is wiped
+        after each of them. The tests of this module use `cleanup_marathon` instead.
+    """
+    if request.function.__module__ != __name__:
+        request.getfixturevalue('wait_for_marathon_and_cleanup')
+
+
 def setup_module(module):
     # When the cluster is starting, it might happen that there is some delay in:
     # - marathon leader registration with mesos
@@ -80,49 +70,46 @@ def teardown_module(module):
     common.clean_up_marathon()
 
 
+def _run_on_hosts(run, hosts):
+    """ Calls `run(host)` for all hosts with at most `SSH_CONCURRENCY` at a time and returns the results in order.
+    """
+    if not hosts:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(min(len(hosts), SSH_CONCURRENCY)) as pool:
+        return list(pool.map(run, hosts))
+
+
 #################################################
 # Root Marathon specific tests
 #################################################
 
 
 @masters(3)
-def test_marathon_delete_leader(marathon_service_name):
-    original_leader = marathon_leader_ip()
-    print('leader: {}'.format(original_leader))
-    common.abdicate_marathon_leader()
-
-    wait_for_service_endpoint(marathon_service_name, timedelta(minutes=5).total_seconds(), path="ping")
-
-    common.assert_marathon_leadership_changed(original_leader)
-
-
-@masters(3)
-def test_marathon_delete_leader_and_check_apps(marathon_service_name):
+@pytest.mark.asyncio
+async def test_marathon_delete_leader_and_check_apps(cleanup_marathon, marathon_client):  # NOQA F811
     original_leader = marathon_leader_ip()
     print('leader: {}'.format(original_leader))
 
     app_def = apps.sleep_app()
     app_id = app_def['id']
 
-    client = marathon.create_client()
-    client.add_app(app_def)
+    marathon_client.add_app(app_def)
+    cleanup_marathon.register(app_id)
     deployment_wait(service_id=app_id)
 
-    app = client.get_app(app_id)
+    app = marathon_client.get_app(app_id)
     assert app['tasksRunning'] == 1, "The number of running tasks is {}, but 1 was expected".format(app["tasksRunning"])
 
     # abdicate leader after app was started successfully
     common.abdicate_marathon_leader()
 
-    wait_for_service_endpoint(marathon_service_name, timedelta(minutes=5).total_seconds(), path="ping")
-
     # wait until leader changed
-    common.assert_marathon_leadership_changed(original_leader)
-    original_leader = marathon_leader_ip()
+    original_leader = await common.await_marathon_leadership_changed(original_leader)
 
-    @retrying.retry(wait_fixed=1000, stop_max_attempt_number=30, retry_on_exception=common.ignore_exception)
+    @retrying.retry(wait_exponential_multiplier=100, wait_exponential_max=2000, stop_max_attempt_number=30,
+                    retry_on_exception=common.ignore_exception)
     def check_app_existence(expected_instances):
-        app = client.get_app(app_id)
+        app = marathon_client.get_app(app_id)
         assert app['tasksRunning'] == expected_instances
         assert app['tasksRunning'] == expected_instances, \
             "The number of running tasks is {}, but {} was expected".format(app["tasksRunning"], expected_instances)
@@ -130,39 +117,33 @@ def test_marathon_delete_leader_and_check_apps(marathon_service_name):
     # check if app definition is still there and one instance is still running after new leader was elected
     check_app_existence(1)
 
-    @retrying.retry(wait_fixed=1000, stop_max_attempt_number=30, retry_on_exception=common.ignore_exception)
+    @retrying.retry(wait_exponential_multiplier=100, wait_exponential_max=2000, stop_max_attempt_number=30,
+                    retry_on_exception=common.ignore_exception)
     def remove_app(app_id):
-        client.remove_app(app_id)
+        marathon_client.remove_app(app_id)
 
     remove_app(app_id)
     deployment_wait(service_id=app_id)
 
-    try:
-        client.get_app(app_id)
-    except Exception:
-        pass
-    else:
-        assert False, "The application resurrected"
+    @retrying.retry(wait_exponential_multiplier=100, wait_exponential_max=2000, stop_max_attempt_number=30,
+                    retry_on_exception=common.ignore_server_error)
+    def assert_app_removed():
+        assert not marathon_client.app_exists(app_id), "The application resurrected"
+
+    assert_app_removed()
 
     # abdicate leader after app was started successfully
     common.abdicate_marathon_leader()
 
-    wait_for_service_endpoint(marathon_service_name, timedelta(minutes=5).total_seconds(), path="ping")
-
     # wait until leader changed
-    common.assert_marathon_leadership_changed(original_leader)
+    await common.await_marathon_leadership_changed(original_leader)
 
     # check if app definition is still not there
-    try:
-        client.get_app(app_id)
-    except Exception:
-        pass
-    else:
-        assert False, "The application resurrected"
+    assert_app_removed()
 
 
 @masters(3)
-def test_marathon_zk_partition_leader_change(marathon_service_name):
+def test_marathon_zk_partition_leader_change(marathon_service_name, cleanup_marathon):  # NOQA F811
 
     original_leader = common.get_marathon_leader_not_on_master_leader_node()
 
@@ -172,31 +153,38 @@ def test_marathon_zk_partition_leader_change(marathon_service_name):
 
 
 @masters(3)
-def test_marathon_master_partition_leader_change(marathon_service_name):
+def test_marathon_master_partition_leader_change(marathon_service_name, cleanup_marathon):  # NOQA F811
 
     original_leader = common.get_marathon_leader_not_on_master_leader_node()
 
     # blocking outbound connection to mesos master
     # Marathon has a Mesos heartbeat interval of 15 seconds. If 5 are missed it
-    # disconnects. Thus we should wait more than 75 seconds.
-    common.block_iptable_rules_for_seconds(original_leader, 5050, sleep_seconds=100,
-                                           block_input=False, block_output=True)
+    # disconnects. Thus the leader changes after more than 75 seconds. The connection
+    # is unblocked as soon as that happened.
+    def leader_changed():
+        # Mesos-DNS has no record for Marathon while there is no leader.
+        records = dcos_dns_lookup('marathon.mesos')
+        return bool(records) and records[0]['ip'] not in ('', original_leader)
+
+    leadership_changed = common.block_iptable_rules_until(
+        original_leader, 5050, leader_changed, max_seconds=120, block_input=False, block_output=True)
 
+    assert leadership_changed, "Marathon leader {} was not replaced while being partitioned".format(original_leader)
     common.assert_marathon_leadership_changed(original_leader)
 
 
 @public_agents(1)
-def test_launch_app_on_public_agent():
+def test_launch_app_on_public_agent(cleanup_marathon, marathon_client):  # NOQA F811
     """ Test the successful launch of a mesos container on public agent.
         MoMs by default do not have slave_public access.
     """
-    client = marathon.create_client()
     app_def = common.add_role_constraint_to_app_def(apps.mesos_app(), ['slave_public'])
     app_id = app_def["id"]
-    client.add_app(app_def)
+    marathon_client.add_app(app_def)
+    cleanup_marathon.register(app_id)
     deployment_wait(service_id=app_id)
 
-    tasks = client.get_tasks(app_id)
+    tasks = marathon_client.get_tasks(app_id)
     task_ip = tasks[0]['host']
 
     assert task_ip in get_public_agents(), "The application task got started on a private agent"
@@ -204,9 +192,8 @@ def test_launch_app_on_public_agent():
 
 @pytest.mark.skipif("is_strict()") # NOQA F811
 @pytest.mark.skipif('marathon_version_less_than("1.3.9")')
-@pytest.mark.usefixtures("wait_for_marathon_and_cleanup")
 @pytest.mark.asyncio
-async def test_event_channel(sse_events):
+async def test_event_channel(sse_events, cleanup_marathon, marathon_client):  # NOQA F811
     """ Tests the event channel. The way events are verified is by converting
         the parsed events to an iterator and asserting the right oder of certain
         events. Unknown events are skipped.
@@ -217,14 +204,14 @@ async def test_event_channel(sse_events):
     app_def = apps.mesos_app()
     app_id = app_def['id']
 
-    client = marathon.create_client()
-    client.add_app(app_def)
+    marathon_client.add_app(app_def)
+    cleanup_marathon.register(app_id)
     deployment_wait(service_id=app_id)
 
     await common.assert_event('deployment_info', sse_events)
     await common.assert_event('deployment_step_success', sse_events)
 
-    client.remove_app(app_id, True)
+    marathon_client.remove_app(app_id, True)
     deployment_wait(service_id=app_id)
 
     await common.assert_event('app_terminated_event', sse_events)
@@ -232,7 +219,7 @@ async def test_event_channel(sse_events):
 
 @dcos_1_9
 @pytest.mark.skipif("is_strict()")
-def test_external_volume():
+def test_external_volume(cleanup_marathon, marathon_client):  # NOQA F811
     volume_name = "marathon-si-test-vol-{}".format(uuid.uuid4().hex)
     app_def = apps.external_volume_mesos_app()
     app_def["container"]["volumes"][0]["external"]["name"] = volume_name
@@ -243,30 +230,30 @@ def test_external_volume():
     # First deployment should create the volume since it has a unique name
     try:
         print('INFO: Deploying {} with external volume {}'.format(app_id, volume_name))
-        client = marathon.create_client()
-        client.add_app(app_def)
+        marathon_client.add_app(app_def)
+        cleanup_marathon.register(app_id)
         deployment_wait(service_id=app_id)
 
         # Create the app: the volume should be successfully created
-        common.assert_app_tasks_running(client, app_def)
-        common.assert_app_tasks_healthy(client, app_def)
+        common.assert_app_tasks_running(marathon_client, app_def)
+        common.assert_app_tasks_healthy(marathon_client, app_def)
 
         # Scale down to 0
         print('INFO: Scaling {} to 0 instances'.format(app_id))
-        client.stop_app(app_id)
+        marathon_client.stop_app(app_id)
         deployment_wait(service_id=app_id)
 
         # Scale up again: the volume should be successfully reused
         print('INFO: Scaling {} back to 1 instance'.format(app_id))
-        client.scale_app(app_id, 1)
+        marathon_client.scale_app(app_id, 1)
         deployment_wait(service_id=app_id)
 
-        common.assert_app_tasks_running(client, app_def)
-        common.assert_app_tasks_healthy(client, app_def)
+        common.assert_app_tasks_running(marathon_client, app_def)
+        common.assert_app_tasks_healthy(marathon_client, app_def)
 
         # Remove the app to be able to remove the volume
         print('INFO: Finally removing {}'.format(app_id))
-        client.remove_app(app_id)
+        marathon_client.remove_app(app_id)
         deployment_wait(service_id=app_id)
     except Exception as e:
         print('Fail to test external volumes: {}'.format(e))
@@ -276,8 +263,9 @@ def test_external_volume():
         # and have to be cleaned manually.
         cmd = 'sudo /opt/mesosphere/bin/dvdcli remove --volumedriver=rexray --volumename={}'.format(volume_name)
         removed = False
-        for agent in get_private_agents():
-            status, output = run_command_on_agent(agent, cmd)  # NOQA
+        agents = get_private_agents()
+        results = _run_on_hosts(lambda agent: run_command_on_agent(agent, cmd), agents)
+        for agent, (status, output) in zip(agents, results):
             print('DEBUG: Failed to remove external volume with name={} on agent={}: {}'.format(
                 volume_name, agent, output))
             if status:
@@ -292,7 +280,8 @@ def test_external_volume():
 
 
 @pytest.mark.skipif('is_multi_master() or marathon_version_less_than("1.5")')
-def test_marathon_backup_and_restore_leader(marathon_service_name):
+@pytest.mark.asyncio
+async def test_marathon_backup_and_restore_leader(cleanup_marathon, marathon_client):  # NOQA F811
     """Backup and restore meeting is done with only one master since new master has to be able
        to read the backup file that was created by the previous master and the easiest way to
        test it is when there is 1 master
@@ -306,11 +295,11 @@ def test_marathon_backup_and_restore_leader(marathon_service_name):
     app_def = apps.sleep_app()
     app_id = app_def['id']
 
-    client = marathon.create_client()
-    client.add_app(app_def)
+    marathon_client.add_app(app_def)
+    cleanup_marathon.register(app_id)
     deployment_wait(service_id=app_id)
 
-    app = client.get_app(app_id)
+    app = marathon_client.get_app(app_id)
     assert app['tasksRunning'] == 1, "The number of running tasks is {}, but 1 was expected".format(app["tasksRunning"])
     task_id = app['tasks'][0]['id']
 
@@ -322,61 +311,68 @@ def test_marathon_backup_and_restore_leader(marathon_service_name):
     common.abdicate_marathon_leader(params)
 
     # Wait for new leader (but same master server) to be up and ready
-    wait_for_service_endpoint(marathon_service_name, timedelta(minutes=5).total_seconds(), path="ping")
-    app = client.get_app(app_id)
+    await common.await_marathon_leader_ready()
+    app = marathon_client.get_app(app_id)
     assert app['tasksRunning'] == 1, "The number of running tasks is {}, but 1 was expected".format(app["tasksRunning"])
     assert task_id == app['tasks'][0]['id'], "Task has a different ID after restore"
 
-    # Check if the backup file exits and is valid
-    cmd = 'tar -tf {}/{} | wc -l'.format(backup_dir, backup_file)
+    # Check if the backup file exits and is valid. Reading the first entry is enough, `head` stops `tar` right after.
+    cmd = 'tar -tf {}/{} | head -n 1 | wc -c'.format(backup_dir, backup_file)
     status, data = run_command_on_master(cmd)
     assert status, 'Failed to validate backup file {}'.format(backup_url)
     assert int(data.rstrip()) > 0, "Backup file is empty"
 
 
+def _clean_backups(*backup_paths):
+    """ Removes the given backup files on all masters in parallel instead of one SSH round-trip after another.
+    """
+    cmd = 'rm -f {}'.format(' '.join(backup_paths))
+    _run_on_hosts(lambda master_ip: run_command(master_ip, cmd), get_all_master_ips())
+
+
 # Regression for MARATHON-7525, introduced in MARATHON-7538
 @masters(3)
 @pytest.mark.skipif('marathon_version_less_than("1.5")')
-def test_marathon_backup_and_check_apps(marathon_service_name):
+@pytest.mark.asyncio
+async def test_marathon_backup_and_check_apps(cleanup_marathon, marathon_client):  # NOQA F811
 
     backup_file1 = 'backup1.tar'
     backup_file2 = 'backup2.tar'
     backup_dir = '/tmp'
 
-    for master_ip in get_all_master_ips():
-        run_command(master_ip, "rm {}/{}".format(backup_dir, backup_file1))
-        run_command(master_ip, "rm {}/{}".format(backup_dir, backup_file2))
-
     backup_url1 = 'file://{}/{}'.format(backup_dir, backup_file1)
     backup_url2 = 'file://{}/{}'.format(backup_dir, backup_file2)
 
-    original_leader = marathon_leader_ip()
+    # Removing stale backups and looking up the leader do not depend on each other
+    loop = asyncio.get_event_loop()
+    original_leader, _ = await asyncio.gather(
+        loop.run_in_executor(None, marathon_leader_ip),
+        loop.run_in_executor(None, _clean_backups,
+                             '{}/{}'.format(backup_dir, backup_file1), '{}/{}'.format(backup_dir, backup_file2)))
     print('leader: {}'.format(original_leader))
 
     app_def = apps.sleep_app()
     app_id = app_def['id']
 
-    client = marathon.create_client()
-    client.add_app(app_def)
+    marathon_client.add_app(app_def)
+    cleanup_marathon.register(app_id)
     deployment_wait(service_id=app_id)
 
-    app = client.get_app(app_id)
+    app = marathon_client.get_app(app_id)
     assert app['tasksRunning'] == 1, "The number of running tasks is {}, but 1 was expected".format(app["tasksRunning"])
 
     # Abdicate the leader with backup
-    original_leader = marathon_leader_ip()
     params = '?backup={}'.format(backup_url1)
     common.abdicate_marathon_leader(params)
 
-    wait_for_service_endpoint(marathon_service_name, timedelta(minutes=5).total_seconds(), path="ping")
-
     # wait until leader changed
-    common.assert_marathon_leadership_changed(original_leader)
+    original_leader = await common.await_marathon_leadership_changed(original_leader)
 
-    @retrying.retry(wait_fixed=1000, stop_max_attempt_number=30, retry_on_exception=common.ignore_exception)
+    @retrying.retry(wait_exponential_multiplier=100, wait_exponential_max=2000, stop_max_attempt_number=30,
+                    retry_on_exception=common.ignore_exception)
     def check_app_existence(expected_instances):
         try:
-            app = client.get_app(app_id)
+            app = marathon_client.get_app(app_id)
         except Exception as e:
             if expected_instances != 0:
                 raise e
@@ -392,7 +388,7 @@ def test_marathon_backup_and_check_apps(marathon_service_name):
     check_app_existence(1)
 
     # then remove
-    client.remove_app(app_id)
+    marathon_client.remove_app(app_id)
     deployment_wait(service_id=app_id)
 
     check_app_existence(0)
@@ -401,17 +397,14 @@ def test_marathon_backup_and_check_apps(marathon_service_name):
     # leads to the state that marathon was not able to re-start, because the second backup failed constantly.
 
     # Abdicate the leader with backup
-    original_leader = marathon_leader_ip()
     print('leader: {}'.format(original_leader))
     params = '?backup={}'.format(backup_url2)
     print('DELETE /v2/leader{}'.format(params))
     common.abdicate_marathon_leader(params)
 
-    wait_for_service_endpoint(marathon_service_name, timedelta(minutes=5).total_seconds(), path="ping")
-
     # wait until leader changed
     # if leader changed, this means that marathon was able to start again, which is great :-).
-    common.assert_marathon_leadership_changed(original_leader)
+    await common.await_marathon_leadership_changed(original_leader)
 
     # check if app definition is still not there and no instance is running after new leader was elected
     check_app_existence(0)
@@ -420,7 +413,7 @@ def test_marathon_backup_and_check_apps(marathon_service_name):
 @common.marathon_1_5
 @pytest.mark.skipif("ee_version() is None")
 @pytest.mark.skipif("common.docker_env_not_set()")
-def test_private_repository_mesos_app():
+def test_private_repository_mesos_app(cleanup_marathon, marathon_client):  # NOQA F811
     """Deploys an app with a private Docker image, using Mesos containerizer.
         It relies on the global `install_enterprise_cli` fixture to install the
         enterprise-cli-package.
@@ -443,20 +436,20 @@ def test_private_repository_mesos_app():
         common.add_dcos_marathon_user_acls()
 
     common.create_secret(secret_name, secret_value)
-    client = marathon.create_client()
 
     try:
-        client.add_app(app_def)
+        marathon_client.add_app(app_def)
+        cleanup_marathon.register(app_id)
         deployment_wait(service_id=app_id)
 
-        common.assert_app_tasks_running(client, app_def)
+        common.assert_app_tasks_running(marathon_client, app_def)
     finally:
         common.delete_secret(secret_name)
 
 
 @pytest.mark.skipif('marathon_version_less_than("1.5")')
 @pytest.mark.skipif("ee_version() is None")
-def test_app_file_based_secret(secret_fixture):
+def test_app_file_based_secret(secret_fixture, cleanup_marathon, marathon_client):  # NOQA F811
 
     secret_name, secret_value = secret_fixture
     secret_container_path = 'mysecretpath'
@@ -491,11 +484,11 @@ def test_app_file_based_secret(secret_fixture):
         }
     }
 
-    client = marathon.create_client()
-    client.add_app(app_def)
+    marathon_client.add_app(app_def)
+    cleanup_marathon.register(app_id)
     deployment_wait(service_id=app_id)
 
-    tasks = client.get_tasks(app_id)
+    tasks = marathon_client.get_tasks(app_id)
     assert len(tasks) == 1, 'Failed to start the file based secret app'
 
     port = tasks[0]['ports'][0]
@@ -503,7 +496,8 @@ def test_app_file_based_secret(secret_fixture):
     # The secret by default is saved in $MESOS_SANDBOX/.secrets/path/to/secret
     cmd = "curl {}:{}/{}_file".format(host, port, secret_container_path)
 
-    @retrying.retry(wait_fixed=1000, stop_max_attempt_number=30, retry_on_exception=common.ignore_exception)
+    @retrying.retry(wait_exponential_multiplier=100, wait_exponential_max=2000, stop_max_attempt_number=30,
+                    retry_on_exception=common.ignore_exception)
     def value_check():
         status, data = run_command_on_master(cmd)
         assert status, "{} did not succeed. status = {}, data = {}".format(cmd, status, data)
@@ -512,15 +506,9 @@ def test_app_file_based_secret(secret_fixture):
     value_check()
 
 
-@dcos_1_9
-@pytest.mark.skipif("ee_version() is None")
-def test_app_secret_env_var(secret_fixture):
-
-    secret_name, secret_value = secret_fixture
-
-    app_id = '/app-secret-env-var-{}'.format(uuid.uuid4().hex)
-    app_def = {
-        "id": app_id,
+def _secret_env_app(secret_name):
+    return {
+        "id": '/app-secret-env-var-{}'.format(uuid.uuid4().hex),
         "instances": 1,
         "cpus": 0.5,
         "mem": 64,
@@ -543,122 +531,10 @@ def test_app_secret_env_var(secret_fixture):
         }
     }
 
-    client = marathon.create_client()
-    client.add_app(app_def)
-    deployment_wait(service_id=app_id)
-
-    tasks = client.get_tasks(app_id)
-    assert len(tasks) == 1, 'Failed to start the secret environment variable app'
-
-    port = tasks[0]['ports'][0]
-    host = tasks[0]['host']
-    cmd = "curl {}:{}/secret-env".format(host, port)
-
-    @retrying.retry(wait_fixed=1000, stop_max_attempt_number=30, retry_on_exception=common.ignore_exception)
-    def value_check():
-        status, data = run_command_on_master(cmd)
-        assert status, "{} did not succeed".format(cmd)
-        assert data.rstrip() == secret_value
-
-    value_check()
-
-
-@dcos_1_9
-@pytest.mark.skipif("ee_version() is None")
-def test_app_inaccessible_secret_env_var():
-
-    secret_name = '/some/secret'    # Secret in an inaccessible namespace
-
-    app_id = '/app-inaccessible-secret-env-var-{}'.format(uuid.uuid4().hex)
-    app_def = {
-        "id": app_id,
-        "instances": 1,
-        "cpus": 0.1,
-        "mem": 64,
-        "cmd": "echo \"shouldn't be called anyway\"",
-        "env": {
-            "SECRET_ENV": {
-                "secret": "secret1"
-            }
-        },
-        "portDefinitions": [{
-            "port": 0,
-            "protocol": "tcp",
-            "name": "api",
-            "labels": {}
-        }],
-        "secrets": {
-            "secret1": {
-                "source": secret_name
-            }
-        }
-    }
-
-    client = marathon.create_client()
-
-    with pytest.raises(requests.HTTPError) as excinfo:
-        client.add_app(app_def)
-
-    print('An app with an inaccessible secret could not be deployed because: {}'.format(excinfo.value))
-    assert excinfo.value.response.status_code == 422
-    assert 'Secret {} is not accessible'.format(secret_name) in excinfo.value.response.text
 
-
-@dcos_1_9
-@pytest.mark.skipif("ee_version() is None")
-def test_pod_inaccessible_secret_env_var():
-
-    secret_name = '/some/secret'    # Secret in an inaccessible namespace
-
-    pod_id = '/pod-inaccessible-secret-env-var-{}'.format(uuid.uuid4().hex)
-    pod_def = {
-        "id": pod_id,
-        "containers": [{
-            "name": "container-1",
-            "resources": {
-                "cpus": 0.1,
-                "mem": 64
-            },
-            "exec": {
-                "command": {
-                    "shell": "echo \"shouldn't be called anyway\""
-                }
-            }
-        }],
-        "environment": {
-            "SECRET_ENV": {
-                "secret": "secret1"
-            }
-        },
-        "networks": [{
-            "mode": "host"
-        }],
-        "secrets": {
-            "secret1": {
-                "source": secret_name
-            }
-        }
-    }
-
-    client = marathon.create_client()
-
-    with pytest.raises(requests.HTTPError) as excinfo:
-        client.add_pod(pod_def)
-
-    print('A pod with an inaccessible secret could not be deployed because: {}'.format(excinfo.value))
-    assert excinfo.value.response.status_code == 422
-    assert 'Secret {} is not accessible'.format(secret_name) in excinfo.value.response.text
-
-
-@dcos_1_9
-@pytest.mark.skipif("ee_version() is None")
-def test_pod_secret_env_var(secret_fixture):
-
-    secret_name, secret_value = secret_fixture
-
-    pod_id = '/pod-secret-env-var-{}'.format(uuid.uuid4().hex)
-    pod_def = {
-        "id": pod_id,
+def _secret_env_pod(secret_name):
+    return {
+        "id": '/pod-secret-env-var-{}'.format(uuid.uuid4().hex),
         "containers": [{
             "name": "container-1",
             "resources": {
@@ -695,18 +571,57 @@ def test_pod_secret_env_var(secret_fixture):
         }
     }
 
-    client = marathon.create_client()
-    client.add_pod(pod_def)
-    deployment_wait(service_id=pod_id)
 
-    instances = client.show_pod(pod_id)['instances']
-    assert len(instances) == 1, 'Failed to start the secret environment variable pod'
+@dcos_1_9
+@pytest.mark.skipif("ee_version() is None")
+@pytest.mark.parametrize("kind", ["app", "pod"])
+@pytest.mark.parametrize("accessible", [True, False], ids=["accessible", "inaccessible"])
+def test_secret_env_var(kind, accessible, secret_fixture, cleanup_marathon, marathon_client):  # NOQA F811
+
+    if accessible:
+        secret_name, secret_value = secret_fixture
+    else:
+        secret_name = '/some/secret'    # Secret in an inaccessible namespace
 
-    port = instances[0]['containers'][0]['endpoints'][0]['allocatedHostPort']
-    host = instances[0]['networks'][0]['addresses'][0]
+    if kind == "app":
+        service_def = _secret_env_app(secret_name)
+        add_service = marathon_client.add_app
+        register_service = cleanup_marathon.register
+    else:
+        service_def = _secret_env_pod(secret_name)
+        add_service = marathon_client.add_pod
+        register_service = cleanup_marathon.register_pod
+    service_id = service_def['id']
+
+    if not accessible:
+        with pytest.raises(requests.HTTPError) as excinfo:
+            add_service(service_def)
+
+        print('A {} with an inaccessible secret could not be deployed because: {}'.format(kind, excinfo.value))
+        assert excinfo.value.response.status_code == 422
+        assert 'Secret {} is not accessible'.format(secret_name) in excinfo.value.response.text
+        return
+
+    add_service(service_def)
+    register_service(service_id)
+    deployment_wait(service_id=service_id)
+
+    if kind == "app":
+        tasks = marathon_client.get_tasks(service_id)
+        assert len(tasks) == 1, 'Failed to start the secret environment variable app'
+
+        port = tasks[0]['ports'][0]
+        host = tasks[0]['host']
+    else:
+        instances = marathon_client.show_pod(service_id)['instances']
+        assert len(instances) == 1, 'Failed to start the secret environment variable pod'
+
+        port = instances[0]['containers'][0]['endpoints'][0]['allocatedHostPort']
+        host = instances[0]['networks'][0]['addresses'][0]
     cmd = "curl {}:{}/secret-env".format(host, port)
 
-    @retrying.retry(wait_fixed=1000, stop_max_attempt_number=30, retry_on_exception=common.ignore_exception)
+    @retrying.retry(wait_exponential_multiplier=100, wait_exponential_max=2000, stop_max_attempt_number=30,
+                    retry_on_exception=common.ignore_exception)
     def value_check():
         status, data = run_command_on_master(cmd)
         assert status, "{} did not succeed. status = {}, data = {}".format(cmd, status, data)
@@ -717,7 +632,7 @@ def test_pod_secret_env_var(secret_fixture):
 
 @pytest.mark.skipif('marathon_version_less_than("1.5")')
 @pytest.mark.skipif("ee_version() is None")
-def test_pod_file_based_secret(secret_fixture):
+def test_pod_file_based_secret(secret_fixture, cleanup_marathon, marathon_client):  # NOQA F811
     secret_name, secret_value = secret_fixture
     secret_normalized_name = secret_name.replace('/', '')
 
@@ -763,18 +678,19 @@ def test_pod_file_based_secret(secret_fixture):
         }
     }
 
-    client = marathon.create_client()
-    client.add_pod(pod_def)
+    marathon_client.add_pod(pod_def)
+    cleanup_marathon.register_pod(pod_id)
     deployment_wait(service_id=pod_id)
 
-    instances = client.show_pod(pod_id)['instances']
+    instances = marathon_client.show_pod(pod_id)['instances']
     assert len(instances) == 1, 'Failed to start the file based secret pod'
 
     port = instances[0]['containers'][0]['endpoints'][0]['allocatedHostPort']
     host = instances[0]['networks'][0]['addresses'][0]
     cmd = "curl {}:{}/{}_file".format(host, port, secret_normalized_name)
 
-    @retrying.retry(wait_fixed=1000, stop_max_attempt_number=30, retry_on_exception=common.ignore_exception)
+    @retrying.retry(wait_exponential_multiplier=100, wait_exponential_max=2000, stop_max_attempt_number=30,
+                    retry_on_exception=common.ignore_exception)
     def value_check():
         status, data = run_command_on_master(cmd)
         assert status, "{} did not succeed. status = {}, data = {}".format(cmd, status, data)
@@ -785,18 +701,17 @@ def test_pod_file_based_secret(secret_fixture):
 
 # Uncomment to run a quick and sure-to-pass SI test on any cluster. Useful for running SI tests locally
 # from fixtures import parent_group
-# def test_foo(parent_group):
-#     client = marathon.create_client()
+# def test_foo(parent_group, marathon_client):
 #     app_def = apps.sleep_app(parent_group=parent_group)
 #     app_id = app_def['id']
-#     client.add_app(app_def)
+#     marathon_client.add_app(app_def)
 #      deployment_wait(service_id=app_id)
 #
-#     tasks = client.get_tasks(app_id)
+#     tasks = marathon_client.get_tasks(app_id)
 #     assert len(tasks) == 1, 'Failed to start a simple sleep app'
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def secret_fixture():
     secret_name = '/mysecret'
     secret_value = 'super_secret_password'